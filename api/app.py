@@ -6,8 +6,14 @@ from langserve import add_routes
 from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 import uvicorn
+from fast_path import parse_fast_input, encode_fast_output
+from debug_profiler import add_debug_routes
+from ollama_residency import ResidencyManager, GB
+from chat_ws import add_chat_websocket
+from ollama_scheduler import FairScheduler, TenantMiddleware
+import threading
 
 load_dotenv()
 
@@ -24,18 +30,36 @@ class SimpleInput(BaseModel):
 # LOAD api key
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
+# Opt-in orjson routes that skip the LangServe input model, set USE_FAST_PATH=true to enable
+USE_FAST_PATH = os.getenv("USE_FAST_PATH", "false").lower() == "true"
+
+# The Ollama server every chain and the residency manager talk to
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Keeps the Ollama models warm between requests, see ollama_residency.py
+residency = ResidencyManager(
+    base_url=OLLAMA_BASE_URL,
+    memory_budget=int(float(os.getenv("OLLAMA_MEMORY_BUDGET_GB", "8")) * GB),
+)
+PRELOAD_MODELS = os.getenv("OLLAMA_PRELOAD", "gemma2:2b,llama3.2:1b,deepseek-r1:1.5b").split(",")
+
+# Shares the one Ollama host between routes and tenants (X-Tenant-ID), see ollama_scheduler.py
+# Match OLLAMA_MAX_CONCURRENCY to the OLLAMA_NUM_PARALLEL the Ollama server runs with
+scheduler = FairScheduler(max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2")))
+
 app = FastAPI(
     title="Langchain Server",
     version="1.0.0",
     description="A simple API server for various LLM chains"
 )
+app.add_middleware(TenantMiddleware)
 
 
 # --- MODEL AND PROMPT DEFINITIONS (Unchanged) ---
 model = ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest")
-llm1 = Ollama(model="gemma2:2b")
-llm2 = Ollama(model="llama3.2:1b")
-llm3 = Ollama(model="deepseek-r1:1.5b")
+llm1 = Ollama(model="gemma2:2b", base_url=OLLAMA_BASE_URL)
+llm2 = Ollama(model="llama3.2:1b", base_url=OLLAMA_BASE_URL)
+llm3 = Ollama(model="deepseek-r1:1.5b", base_url=OLLAMA_BASE_URL)
 
 prompt1 = ChatPromptTemplate.from_template("You are a helpful and intelligent assistant. please Write a short story about {topic} in less than 500 words.")
 prompt2 = ChatPromptTemplate.from_template("You are a helpful and intelligent assistant. please Write a poem about {topic} in less than 300 words by maintaining a proper rhyming scheme.")
@@ -59,25 +83,30 @@ prompt4 = ChatPromptTemplate.from_messages(
     ]
 )
 
+# residency.track runs before the scheduler slot is taken, so a cold model load never holds a slot
+essay_chain = prompt1 | residency.track(llm3) | scheduler.wrap(llm3, route="essay")
+poem_chain = prompt2 | residency.track(llm1) | scheduler.wrap(llm1, route="poem")
+chat_chain = prompt3 | residency.track(llm2) | scheduler.wrap(llm2, route="chat") | StrOutputParser()
+
 # --- ADD CHAIN ROUTES WITH EXPLICIT INPUT TYPES ---
 
 add_routes(
     app,
-    prompt1 | llm3,
+    essay_chain,
     path="/essay",
     input_type=TopicInput
 )
 
 add_routes(
     app,
-    prompt2 | llm1,
+    poem_chain,
     path="/poem",
     input_type=TopicInput
 )
 
 add_routes(
     app,
-    prompt3 | llm2 | StrOutputParser(),
+    chat_chain,
     path="/chat",
     input_type=QuestionInput
 )
@@ -89,5 +118,53 @@ add_routes(
     input_type=QuestionInput
 )
 
+# Streaming /chat over a persistent WebSocket, see chat_ws.py
+add_chat_websocket(app, chat_chain, path="/chat/ws")
+
+# --- FAST PATH ROUTES FOR THE HOT OLLAMA CHAINS ---
+
+def add_fast_route(chain, path, field_name):
+    """
+    Registers {path}/fast/invoke, which takes the same body as {path}/invoke
+    but parses it with orjson. The response is only {"output": ...}, without
+    the metadata (run_id, feedback_tokens) LangServe adds to /invoke responses.
+    """
+    async def fast_invoke(request: Request):
+        value = parse_fast_input(await request.body(), field_name)
+        output = await chain.ainvoke({field_name: value})
+        return Response(content=encode_fast_output(output), media_type="application/json")
+
+    app.add_api_route(f"{path}/fast/invoke", fast_invoke, methods=["POST"], tags=["Fast Path"])
+
+if USE_FAST_PATH:
+    add_fast_route(essay_chain, "/essay", "topic")
+    add_fast_route(poem_chain, "/poem", "topic")
+    add_fast_route(chat_chain, "/chat", "question")
+
+# --- OLLAMA MODEL RESIDENCY ---
+
+def preload_models():
+    # Runs in the background so the server starts right away. A request only waits if its own model is still loading
+    threading.Thread(target=residency.preload, args=([m.strip() for m in PRELOAD_MODELS if m.strip()],), daemon=True).start()
+
+app.router.on_startup.append(preload_models)
+
+@app.get("/ollama/residency", tags=["Ollama"])
+def ollama_residency():
+    """
+    Loaded models, their keep_alive, cold-hit counts and recent load/unload events.
+    """
+    return residency.report()
+
+@app.get("/ollama/scheduler", tags=["Ollama"])
+def ollama_scheduler():
+    """
+    Running and queued requests, route weights and the learned output length estimates.
+    """
+    return scheduler.report()
+
+# /debug/profile and /debug/loop, only when DEBUG_PROFILE_TOKEN is set
+add_debug_routes(app)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
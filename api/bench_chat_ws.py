@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+import requests
+from websockets.sync.client import connect
+
+# Per-message overhead of /chat/ws against repeated /chat/invoke calls.
+# To keep model time out of the numbers, run fake_ollama.py and start app.py against it. app.py's
+# chains and residency manager all use OLLAMA_BASE_URL. The fake answers in one non-streamed chunk,
+# which OllamaLLM.astream passes on as a single token:
+#   python fake_ollama.py 11500
+#   OLLAMA_BASE_URL=http://localhost:11500 python app.py
+#   python bench_chat_ws.py --messages 200 --server-pid <pid of app.py>
+
+QUESTION = "what's a good name for a cat?"
+
+
+def server_usage(pid):
+    """
+    CPU seconds, resident memory (MB) and open sockets of the server process, read from /proc (Linux only).
+    """
+    if pid is None:
+        return None
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu = (int(fields[11]) + int(fields[12])) / ticks
+    with open(f"/proc/{pid}/status") as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+    fd_dir = f"/proc/{pid}/fd"
+    sockets = sum(1 for fd in os.listdir(fd_dir) if os.readlink(os.path.join(fd_dir, fd)).startswith("socket:"))
+    return cpu, rss, sockets
+
+
+def http_new_connection(base_url, messages):
+    timings = []
+    for _ in range(messages):
+        started = time.perf_counter()
+        response = requests.post(f"{base_url}/chat/invoke", json={"input": {"question": QUESTION}})
+        response.raise_for_status()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def http_keep_alive(base_url, messages):
+    timings = []
+    with requests.Session() as session:
+        for _ in range(messages):
+            started = time.perf_counter()
+            response = session.post(f"{base_url}/chat/invoke", json={"input": {"question": QUESTION}})
+            response.raise_for_status()
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def websocket(base_url, messages):
+    timings = []
+    with connect(base_url.replace("http", "ws", 1) + "/chat/ws") as ws:
+        for _ in range(messages):
+            started = time.perf_counter()
+            ws.send(json.dumps({"type": "message", "question": QUESTION}))
+            while json.loads(ws.recv())["type"] == "token":
+                pass
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--server-pid", type=int, default=None)
+    args = parser.parse_args()
+
+    for name, mode in [("/chat/invoke, new connection", http_new_connection),
+                       ("/chat/invoke, keep-alive", http_keep_alive),
+                       ("/chat/ws", websocket)]:
+        before = server_usage(args.server_pid)
+        timings = sorted(mode(args.base_url, args.messages))
+        after = server_usage(args.server_pid)
+
+        print(name)
+        print(f"  mean {statistics.mean(timings) * 1000:8.2f} ms   p50 {timings[len(timings) // 2] * 1000:8.2f} ms   "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1000:8.2f} ms")
+        if before and after:
+            print(f"  server cpu {(after[0] - before[0]) / args.messages * 1000:.2f} ms/message   "
+                  f"rss {after[1]:.1f} MB ({after[1] - before[1]:+.1f})   open sockets {after[2]}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,52 @@
+import json
+import timeit
+from pydantic import BaseModel
+from fast_path import parse_fast_input, encode_fast_output
+
+# Microbenchmarks for the /fast/invoke routes in app.py.
+# Run from the api folder: python bench_fast_path.py
+
+
+# Same shapes app.py hands to LangServe, wrapped the way /invoke receives them
+class TopicInput(BaseModel):
+    topic: str
+
+class QuestionInput(BaseModel):
+    question: str
+
+class TopicRequest(BaseModel):
+    input: TopicInput
+
+class QuestionRequest(BaseModel):
+    input: QuestionInput
+
+
+ENDPOINTS = [
+    # (path, field name, request model, sample output size in characters)
+    ("/essay", "topic", TopicRequest, 3000),
+    ("/poem", "topic", TopicRequest, 1800),
+    ("/chat", "question", QuestionRequest, 600),
+]
+
+NUMBER = 20000
+
+
+def bench(label, func):
+    seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+    print(f"  {label:<28} {seconds / NUMBER * 1e6:8.2f} us")
+
+
+def run():
+    for path, field_name, request_model, output_size in ENDPOINTS:
+        body = json.dumps({"input": {field_name: "a rainy evening in the mountains"}}).encode("utf-8")
+        output = "Lorem ipsum dolor sit amet. " * (output_size // 28)
+
+        print(path)
+        bench("parse: pydantic", lambda: request_model.model_validate_json(body))
+        bench("parse: fast path", lambda: parse_fast_input(body, field_name))
+        bench("encode: json", lambda: json.dumps({"output": output}).encode("utf-8"))
+        bench("encode: fast path", lambda: encode_fast_output(output))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,92 @@
+import asyncio
+import random
+import statistics
+import time
+
+from ollama_scheduler import FairScheduler, current_tenant
+
+# Chat latency under an essay flood, plain FIFO slots against FairScheduler.
+# The Ollama host is simulated: each request holds one of MAX_CONCURRENCY slots for
+# output length * SECONDS_PER_CHAR, so no models are needed. Run: python bench_scheduler.py
+
+MAX_CONCURRENCY = 2
+SECONDS_PER_CHAR = 0.00005        # ~20k chars/s per slot, shrunk so the run takes a few seconds
+DURATION = 4.0
+ESSAY_FLOOD = 40                  # essays queued at t=0 by the "batch" tenant
+ESSAY_EVERY = 0.1                 # then one more essay this often
+CHAT_EVERY = 0.05                 # interactive chat turns from the "alice" tenant
+POEM_EVERY = 0.3
+
+OUTPUT_LENGTHS = {"essay": (2500, 3500), "poem": (1200, 1800), "chat": (200, 900)}
+
+
+class FifoSlots:
+    """
+    What the app did before the scheduler: first come, first served on a fixed number of slots.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, route: str, length: int):
+        async with self.semaphore:
+            await asyncio.sleep(length * SECONDS_PER_CHAR)
+
+
+class FairSlots:
+    def __init__(self, max_concurrency: int):
+        self.scheduler = FairScheduler(max_concurrency=max_concurrency)
+
+    async def run(self, route: str, length: int):
+        async with self.scheduler.slot(route) as job:
+            await asyncio.sleep(length * SECONDS_PER_CHAR)
+            job.output_length = length
+
+
+async def request(slots, route: str, tenant: str, latencies: dict):
+    current_tenant.set(tenant)
+    length = random.randint(*OUTPUT_LENGTHS[route])
+    started = time.perf_counter()
+    await slots.run(route, length)
+    latencies[route].append(time.perf_counter() - started)
+
+
+async def arrivals(slots, route: str, tenant: str, every: float, latencies: dict, tasks: list):
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(request(slots, route, tenant, latencies)))
+        await asyncio.sleep(random.expovariate(1 / every))
+
+
+async def workload(slots) -> dict:
+    latencies = {route: [] for route in OUTPUT_LENGTHS}
+    tasks = [asyncio.create_task(request(slots, "essay", "batch", latencies)) for _ in range(ESSAY_FLOOD)]
+    await asyncio.gather(
+        arrivals(slots, "essay", "batch", ESSAY_EVERY, latencies, tasks),
+        arrivals(slots, "poem", "alice", POEM_EVERY, latencies, tasks),
+        arrivals(slots, "chat", "alice", CHAT_EVERY, latencies, tasks),
+    )
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run():
+    for name, slots_class in [("FIFO", FifoSlots), ("FairScheduler", FairSlots)]:
+        random.seed(7)
+        started = time.perf_counter()
+        latencies = asyncio.run(workload(slots_class(MAX_CONCURRENCY)))
+        elapsed = time.perf_counter() - started
+
+        print(f"{name}  (drained in {elapsed:.1f} s)")
+        for route, values in latencies.items():
+            print(f"  {route:<6} n={len(values):<4} p50 {statistics.median(values) * 1000:8.1f} ms   "
+                  f"p99 {percentile(values, 0.99) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    run()
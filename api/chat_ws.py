@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+# WebSocket version of /chat, one connection per user session.
+#
+# Client -> server:  {"type": "message", "question": "..."}   start a reply
+#                    {"type": "cancel"}                        stop the reply in progress
+# Server -> client:  {"type": "token", "content": "..."}      one per streamed chunk
+#                    {"type": "done"} / {"type": "cancelled"} / {"type": "error", "detail": "..."}
+
+SEND_BUFFER_SIZE = 256      # queued messages per connection before we wait on the client
+SLOW_CLIENT_TIMEOUT = 10.0  # seconds a full buffer may stay full before the reply is dropped
+
+
+class SlowClientError(Exception):
+    """The client let the send buffer stay full for longer than SLOW_CLIENT_TIMEOUT."""
+
+
+class ChatSession:
+    """
+    Runs one chat connection: a receive loop, a sender draining the bounded buffer,
+    and at most one generation task at a time.
+    """
+
+    def __init__(self, websocket: WebSocket, chain):
+        self.websocket = websocket
+        self.chain = chain
+        self.outbox = asyncio.Queue(maxsize=SEND_BUFFER_SIZE)
+        self.generation = None
+        self.sender_task = None
+
+    async def send(self, message: dict):
+        """
+        Queues a message for the client, cancelling the reply if the client stops reading.
+        """
+        try:
+            await asyncio.wait_for(self.outbox.put(message), SLOW_CLIENT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SlowClientError()
+
+    async def sender(self):
+        try:
+            while True:
+                message = await self.outbox.get()
+                await self.websocket.send_json(message)
+        except (WebSocketDisconnect, RuntimeError):
+            # The socket is gone, the receive loop sees the disconnect and cleans up
+            pass
+
+    async def close_slow_client(self):
+        """
+        Stops the sender first so nothing is sent after the close frame.
+        """
+        self.sender_task.cancel()
+        try:
+            await self.websocket.close(code=1013, reason="Client is not reading fast enough.")
+        except RuntimeError:
+            pass  # already closed
+
+    async def generate(self, question: str):
+        try:
+            async for chunk in self.chain.astream({"question": question}):
+                await self.send({"type": "token", "content": chunk})
+            await self.send({"type": "done"})
+        except asyncio.CancelledError:
+            # Leaving astream closes the stream to Ollama, which stops the model right away
+            if not self.outbox.full():
+                self.outbox.put_nowait({"type": "cancelled"})
+            raise
+        except SlowClientError:
+            await self.close_slow_client()
+        except Exception as e:
+            try:
+                await self.send({"type": "error", "detail": f"An error occurred: {e}"})
+            except SlowClientError:
+                await self.close_slow_client()
+
+    async def handle(self, message: dict):
+        kind = message.get("type")
+
+        if kind == "cancel":
+            if self.generation and not self.generation.done():
+                self.generation.cancel()
+            return
+
+        if kind != "message" or not isinstance(message.get("question"), str):
+            await self.send({"type": "error", "detail": 'Expected {"type": "message", "question": "..."} or {"type": "cancel"}.'})
+            return
+
+        if self.generation and not self.generation.done():
+            await self.send({"type": "error", "detail": "A reply is already in progress, cancel it first."})
+            return
+
+        self.generation = asyncio.create_task(self.generate(message["question"]))
+
+    async def run(self):
+        await self.websocket.accept()
+        self.sender_task = asyncio.create_task(self.sender())
+        try:
+            while True:
+                frame = await self.websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                try:
+                    # Binary frames have no "text", they get the same error as malformed JSON
+                    message = json.loads(frame.get("text") or "")
+                except json.JSONDecodeError:
+                    message = None
+                await self.handle(message if isinstance(message, dict) else {})
+        except WebSocketDisconnect:
+            pass
+        except SlowClientError:
+            await self.close_slow_client()
+        finally:
+            if self.generation:
+                self.generation.cancel()
+            self.sender_task.cancel()
+
+
+def add_chat_websocket(app: FastAPI, chain, path: str = "/chat/ws"):
+    """
+    Serves `chain` (the prompt3 | llm2 chat chain) over a WebSocket at `path`.
+    """
+    @app.websocket(path)
+    async def chat_ws(websocket: WebSocket):
+        await ChatSession(websocket, chain).run()
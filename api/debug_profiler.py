@@ -0,0 +1,233 @@
+import asyncio
+import os
+import secrets
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+# On-demand profiling routes for the FastAPI services.
+# Only registered when DEBUG_PROFILE_TOKEN is set, every call must send it in the X-Debug-Token header.
+
+SAMPLE_INTERVAL = 0.005      # seconds between stack samples
+MAX_PROFILE_SECONDS = 60
+LOOP_TICK = 0.05             # how often the event loop heartbeat runs
+SLOW_CALLBACK_SECONDS = 0.1  # a loop stall longer than this is reported as a slow callback
+
+
+# --- Sampling Profiler ---
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def collect_stack(frame) -> tuple:
+    """
+    Walks a frame up to the thread's entry point, returned root first.
+    """
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_code.co_name, frame.f_code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+class StackSampler:
+    """
+    Samples every thread's Python stack from a background thread with sys._current_frames().
+    The event loop keeps running while it samples, so async handlers and worker threads both show up.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()  # (thread name, stack) -> sample count
+        self.duration = 0.0
+
+    def run(self, seconds: float):
+        own_id = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.samples[(names.get(thread_id, str(thread_id)), collect_stack(frame))] += 1
+            time.sleep(self.interval)
+
+        self.duration = time.perf_counter() - started
+
+    def collapsed(self) -> str:
+        """
+        Brendan Gregg's collapsed stack format, one 'thread;frame;frame count' line per stack.
+        """
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{thread_name};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        """
+        A speedscope.app file with one sampled profile per thread.
+        """
+        frames, frame_index, profiles = [], {}, {}
+
+        for (thread_name, stack), count in self.samples.items():
+            indices = []
+            for name, filename, line in stack:
+                key = (name, filename, line)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": name, "file": filename, "line": line})
+                indices.append(frame_index[key])
+
+            profile = profiles.setdefault(thread_name, {"samples": [], "weights": []})
+            profile["samples"].append(indices)
+            profile["weights"].append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(profile["weights"]),
+                    "samples": profile["samples"],
+                    "weights": profile["weights"],
+                }
+                for thread_name, profile in profiles.items()
+            ],
+            "name": f"{self.duration:.1f}s sampled profile",
+            "exporter": "debug_profiler",
+        }
+
+
+# --- Event Loop Lag Monitor ---
+
+class LoopMonitor:
+    """
+    Tracks how late the event loop runs a periodic heartbeat.
+    A watchdog thread grabs the loop thread's stack while a stall is still in progress,
+    so a blocking call like requests.post inside an async handler is named in the warning.
+    """
+
+    def __init__(self, tick: float = LOOP_TICK, threshold: float = SLOW_CALLBACK_SECONDS):
+        self.tick = tick
+        self.threshold = threshold
+        self.lags = deque(maxlen=1200)            # last minute of heartbeat lag at the default tick
+        self.slow_callbacks = deque(maxlen=50)
+        self.max_lag = 0.0
+        self.last_beat = time.monotonic()
+        self.loop_thread_id = None
+        self.started = False
+
+    async def heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.tick
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self.last_beat = now
+
+    def watchdog(self):
+        reported_beat = None
+        while True:
+            time.sleep(self.tick)
+            stalled = time.monotonic() - self.last_beat
+            if stalled < self.threshold + self.tick or self.last_beat == reported_beat:
+                continue
+
+            # One warning per stall, taken while the loop thread is still blocked
+            reported_beat = self.last_beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            self.slow_callbacks.append({
+                "detected_at": time.time(),
+                "stalled_for": round(stalled, 3),
+                "location": frame_label(frame) if frame is not None else None,
+                "stack": [line.strip() for line in stack[-15:]],
+            })
+
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        asyncio.get_running_loop().create_task(self.heartbeat())
+        threading.Thread(target=self.watchdog, name="loop-watchdog", daemon=True).start()
+
+    def report(self) -> dict:
+        lags = sorted(self.lags)
+        return {
+            "current_lag": round(self.lags[-1], 4) if self.lags else 0.0,
+            "p50_lag": round(lags[len(lags) // 2], 4) if lags else 0.0,
+            "p99_lag": round(lags[int(len(lags) * 0.99)], 4) if lags else 0.0,
+            "max_lag": round(self.max_lag, 4),
+            "seconds_since_last_tick": round(time.monotonic() - self.last_beat, 4),
+            "slow_callback_threshold": self.threshold,
+            "slow_callbacks": list(self.slow_callbacks),
+        }
+
+
+# --- Routes ---
+
+def add_debug_routes(app: FastAPI):
+    """
+    Adds /debug/profile and /debug/loop to the app, if DEBUG_PROFILE_TOKEN is configured.
+    """
+    token = os.getenv("DEBUG_PROFILE_TOKEN")
+    if not token:
+        return
+
+    monitor = LoopMonitor()
+    profile_lock = asyncio.Lock()
+
+    async def start_monitor():
+        monitor.start()
+
+    app.router.on_startup.append(start_monitor)
+
+    def check_token(x_debug_token: str = Header(None)):
+        """
+        Runs as a dependency, so callers without the token get 403 before any query validation.
+        Headers arrive decoded as latin-1, comparing bytes keeps non-ASCII tokens from raising.
+        """
+        if x_debug_token is None or not secrets.compare_digest(x_debug_token.encode("latin-1"), token.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="Invalid or missing X-Debug-Token header.")
+
+    @app.get("/debug/profile", tags=["Debug"], dependencies=[Depends(check_token)])
+    async def profile(
+        seconds: float = Query(5, gt=0, le=MAX_PROFILE_SECONDS),
+        format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    ):
+        """
+        Samples all threads for N seconds and returns a collapsed-stack or speedscope flame graph.
+        """
+        if profile_lock.locked():
+            raise HTTPException(status_code=409, detail="A profile is already running.")
+
+        async with profile_lock:
+            sampler = StackSampler()
+            await asyncio.to_thread(sampler.run, seconds)
+
+        if format == "speedscope":
+            return sampler.speedscope()
+        return PlainTextResponse(sampler.collapsed())
+
+    @app.get("/debug/loop", tags=["Debug"], dependencies=[Depends(check_token)])
+    async def loop_lag():
+        """
+        Reports event loop lag and the stacks of recent slow callbacks.
+        """
+        return monitor.report()
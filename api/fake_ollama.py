@@ -0,0 +1,125 @@
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A stand-in for the Ollama server, for trying out ollama_residency.py without real models.
+# Loading a model takes LOAD_SECONDS, and models unload on their own once keep_alive runs out.
+# Run: python fake_ollama.py [port], then point ResidencyManager(base_url=...) at it.
+
+LOAD_SECONDS = 2.0
+MODEL_SIZE = 1024 ** 3
+
+
+class FakeOllama:
+    def __init__(self, load_seconds: float = LOAD_SECONDS, model_sizes: dict = None):
+        self.load_seconds = load_seconds
+        self.model_sizes = model_sizes or {}
+        self.loaded = {}  # model -> expiry (unix time)
+        self.load_count = 0
+        self.log = []     # ("load" | "unload", model) in the order they happened
+        self.lock = threading.Lock()
+
+    def generate(self, model: str, keep_alive, prompt: str) -> dict:
+        keep_alive = 300 if keep_alive is None else parse_duration(keep_alive)
+
+        with self.lock:
+            self.expire()
+            cold = model not in self.loaded
+
+        if keep_alive == 0:
+            with self.lock:
+                if self.loaded.pop(model, None) is not None:
+                    self.log.append(("unload", model))
+            return {"model": model, "response": "", "done": True, "done_reason": "unload"}
+
+        if cold:
+            time.sleep(self.load_seconds)
+
+        with self.lock:
+            if cold:
+                self.load_count += 1
+                self.log.append(("load", model))
+            self.loaded[model] = time.time() + keep_alive
+
+        return {
+            "model": model,
+            "response": f"echo: {prompt}" if prompt else "",
+            "done": True,
+            "load_duration": int(self.load_seconds * 1e9) if cold else 0,
+        }
+
+    def expire(self):
+        now = time.time()
+        for model, expires_at in list(self.loaded.items()):
+            if expires_at <= now:
+                del self.loaded[model]
+
+    def ps(self) -> dict:
+        with self.lock:
+            self.expire()
+            models = []
+            for model, expires_at in self.loaded.items():
+                # Like Ollama, untagged names come back as name:latest
+                name = model if ":" in model else f"{model}:latest"
+                size = self.model_sizes.get(model, MODEL_SIZE)
+                expires = datetime.fromtimestamp(expires_at, timezone.utc).isoformat().replace("+00:00", "Z")
+                models.append({"name": name, "model": name, "size": size, "size_vram": size, "expires_at": expires})
+            return {"models": models}
+
+
+def parse_duration(value) -> float:
+    """
+    Ollama accepts keep_alive as seconds or a duration string like "5m".
+    """
+    if isinstance(value, (int, float)):
+        return max(0, value)
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def make_server(port: int = 11434, load_seconds: float = LOAD_SECONDS, model_sizes: dict = None):
+    """
+    Returns (server, fake). Call server.serve_forever(), usually from a thread.
+    Port 0 picks a free port, read it back from server.server_address.
+    """
+    fake = FakeOllama(load_seconds, model_sizes)
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, data):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/ps":
+                self.send_json(fake.ps())
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self.send_json(fake.generate(payload["model"], payload.get("keep_alive"), payload.get("prompt", "")))
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", port), Handler)
+    return server, fake
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 11434
+    server, _ = make_server(port)
+    print(f"Fake Ollama listening on http://localhost:{port}")
+    server.serve_forever()
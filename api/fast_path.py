@@ -0,0 +1,28 @@
+import orjson
+from fastapi import HTTPException
+
+
+# --- Lightweight input parsing for the hot LangServe routes ---
+
+def parse_fast_input(body: bytes, field_name: str) -> str:
+    """
+    Pulls a single string field out of a LangServe-style {"input": {...}} body.
+    Skips building a Pydantic model, the value only has to be a string.
+    """
+    try:
+        value = orjson.loads(body)["input"][field_name]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        raise HTTPException(status_code=422, detail=f'Expected a body like {{"input": {{"{field_name}": "..."}}}}.')
+
+    if not isinstance(value, str):
+        raise HTTPException(status_code=422, detail=f"'{field_name}' must be a string.")
+
+    return value
+
+
+def encode_fast_output(output) -> bytes:
+    """
+    Encodes the chain output as {"output": ...}, the output field of an /invoke
+    response without LangServe's metadata.
+    """
+    return orjson.dumps({"output": output})
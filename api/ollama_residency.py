@@ -0,0 +1,276 @@
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import requests
+from langchain_core.runnables import RunnableLambda
+
+# Keeps the local Ollama models warm so requests don't pay the model load time.
+# Ollama unloads a model once its keep_alive runs out, so every request we send carries a keep_alive
+# based on that model's recent traffic, and we unload the least recently used model ourselves
+# whenever loading another one would go over the memory budget.
+#
+# What is loaded comes from Ollama's /api/ps, so models loaded by other clients on the same host
+# (the Streamlit apps) count against the budget too. Ones we never sent traffic to are evicted first.
+
+GB = 1024 ** 3
+
+# Rough resident sizes, replaced by the real number from /api/ps once a model is loaded
+DEFAULT_MODEL_SIZES = {
+    "gemma2:2b": int(2.0 * GB),
+    "llama3.2:1b": int(1.6 * GB),
+    "deepseek-r1:1.5b": int(1.4 * GB),
+    "gemma3": int(4.0 * GB),
+}
+
+SYNC_INTERVAL = 2.0  # seconds a /api/ps snapshot is trusted for requests to already loaded models
+
+
+def model_name(name: str) -> str:
+    return name[:-len(":latest")] if name.endswith(":latest") else name
+
+def parse_expires_at(value: str) -> float:
+    """
+    /api/ps reports expiry as RFC 3339 with nanoseconds, fromisoformat only takes microseconds.
+    """
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value).replace("Z", "+00:00")
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ResidencyManager:
+    """
+    Tracks which models are loaded in Ollama and decides how long each one should stay there.
+    self.lock only guards bookkeeping, loads and unloads happen outside it, so a request for a
+    loaded model never waits on another model's load. Requests for a model that is being loaded
+    wait on that model's Event.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model_sizes: dict = None,
+        memory_budget: int = 8 * GB,
+        min_keep_alive: int = 300,       # seconds, Ollama's own default
+        max_keep_alive: int = 3600,
+        busy_requests: int = 30,         # requests per traffic window that earn max_keep_alive
+        traffic_window: int = 3600,
+        timeout: float = 120,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model_sizes = dict(model_sizes or DEFAULT_MODEL_SIZES)
+        self.memory_budget = memory_budget
+        self.min_keep_alive = min_keep_alive
+        self.max_keep_alive = max_keep_alive
+        self.busy_requests = busy_requests
+        self.traffic_window = traffic_window
+        self.timeout = timeout
+
+        self.resident = {}             # model -> expiry (unix time), as last reported by /api/ps
+        self.synced_at = 0.0
+        self.loading = {}              # model -> Event set once its load finishes
+        self.last_used = {}            # model -> monotonic time of our last request, drives LRU
+        self.traffic = {}              # model -> deque of request times
+        self.cold_hits = {}
+        self.events = deque(maxlen=200)
+        self.llms = {}                 # model -> OllamaLLM objects whose keep_alive we keep in sync
+        self.lock = threading.Lock()
+
+    # --- Ollama calls (never made while holding self.lock) ---
+
+    def _generate(self, model: str, keep_alive: int):
+        """
+        An empty prompt makes Ollama load (or with keep_alive 0, unload) the model without generating.
+        """
+        response = requests.post(
+            f"{self.base_url}/api/generate",
+            json={"model": model, "keep_alive": keep_alive, "stream": False},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def _sync_resident(self):
+        """
+        Rebuilds self.resident and the model sizes from /api/ps. Keeps the old view if Ollama can't be reached.
+        """
+        try:
+            response = requests.get(f"{self.base_url}/api/ps", timeout=self.timeout)
+            response.raise_for_status()
+            entries = response.json().get("models", [])
+        except requests.exceptions.RequestException:
+            return
+
+        resident = {}
+        for entry in entries:
+            name = entry.get("name") or entry.get("model")
+            if not name:
+                continue
+            model = model_name(name)
+            size = entry.get("size_vram") or entry.get("size")
+            if size:
+                with self.lock:
+                    self.model_sizes[model] = size
+            try:
+                resident[model] = parse_expires_at(entry["expires_at"])
+            except (KeyError, ValueError):
+                resident[model] = time.time() + self.min_keep_alive
+
+        with self.lock:
+            # Our own evictions are already gone from self.resident, anything else that vanished
+            # was unloaded by Ollama itself once its keep_alive ran out
+            for model in self.resident.keys() - resident.keys():
+                if model not in self.loading:
+                    self._record("unload", model, reason="expired")
+            self.resident = resident
+            self.synced_at = time.monotonic()
+
+    def _record(self, event: str, model: str, **details):
+        self.events.append({"time": time.time(), "event": event, "model": model, **details})
+
+    # --- Bookkeeping (callers hold self.lock) ---
+
+    def _is_resident(self, model: str) -> bool:
+        return self.resident.get(model, 0) > time.time()
+
+    def _used_bytes(self) -> int:
+        models = {model for model in self.resident if self._is_resident(model)} | set(self.loading)
+        return sum(self.model_sizes.get(model, 0) for model in models)
+
+    def _pick_victims(self, model: str) -> list:
+        """
+        Least recently used resident models to unload so `model` fits in the budget.
+        Models that are still loading are never picked.
+        """
+        candidates = sorted(
+            (m for m in self.resident if self._is_resident(m) and m not in self.loading and m != model),
+            key=lambda m: self.last_used.get(m, 0.0),
+        )
+        needed = self.model_sizes.get(model, 0)
+        used = self._used_bytes()
+        victims = []
+        for victim in candidates:
+            if used + needed <= self.memory_budget:
+                break
+            victims.append(victim)
+            used -= self.model_sizes.get(victim, 0)
+        return victims
+
+    # --- Loading ---
+
+    def _ensure_loaded(self, model: str, cold_hit: bool):
+        """
+        Loads `model` unless it is already resident. If another thread is loading it, waits for that load instead.
+        """
+        with self.lock:
+            if self._is_resident(model):
+                return
+            if cold_hit:
+                self.cold_hits[model] = self.cold_hits.get(model, 0) + 1
+                self._record("cold_hit", model)
+            loading = self.loading.get(model)
+            if loading is not None:
+                owner = False
+            else:
+                owner = True
+                victims = self._pick_victims(model)
+                loading = self.loading[model] = threading.Event()
+                for victim in victims:
+                    del self.resident[victim]
+                keep_alive = self.keep_alive_for(model)
+
+        if owner:
+            self._load(model, loading, victims, keep_alive)
+        else:
+            loading.wait(self.timeout)
+
+    def _load(self, model: str, loading, victims: list, keep_alive: int):
+        try:
+            for victim in victims:
+                self._generate(victim, 0)
+                self._record("unload", victim, reason="memory budget")
+
+            started = time.perf_counter()
+            self._generate(model, keep_alive)
+            self._record("load", model, seconds=round(time.perf_counter() - started, 3), keep_alive=keep_alive)
+        except requests.exceptions.RequestException as e:
+            # Let the real request go through, Ollama will load the model itself
+            self._record("load_failed", model, error=str(e))
+        finally:
+            with self.lock:
+                del self.loading[model]
+            loading.set()
+        self._sync_resident()
+
+    # --- Public API ---
+
+    def keep_alive_for(self, model: str) -> int:
+        """
+        Scales keep_alive linearly from min_keep_alive (no recent traffic) to max_keep_alive (busy_requests or more).
+        """
+        cutoff = time.monotonic() - self.traffic_window
+        recent = self.traffic.get(model, ())
+        count = sum(1 for t in recent if t >= cutoff)
+        share = min(1.0, count / self.busy_requests)
+        return int(self.min_keep_alive + (self.max_keep_alive - self.min_keep_alive) * share)
+
+    def preload(self, models: list):
+        """
+        Loads the given models up front, skipping any that would push another one out.
+        """
+        for model in models:
+            self._sync_resident()
+            with self.lock:
+                fits = self._used_bytes() + self.model_sizes.get(model, 0) <= self.memory_budget
+                if not self._is_resident(model) and not fits:
+                    self._record("skipped_preload", model, reason="memory budget")
+                    continue
+            self._ensure_loaded(model, cold_hit=False)
+
+    def touch(self, model: str):
+        """
+        Call right before sending a request to `model`. Loads it if needed and updates its keep_alive.
+        """
+        with self.lock:
+            now = time.monotonic()
+            traffic = self.traffic.setdefault(model, deque())
+            traffic.append(now)
+            while traffic and traffic[0] < now - self.traffic_window:
+                traffic.popleft()
+            self.last_used[model] = now
+
+            keep_alive = self.keep_alive_for(model)
+            for llm in self.llms.get(model, []):
+                llm.keep_alive = keep_alive
+
+            # The request itself carries the new keep_alive, so a fresh snapshot showing the model is enough
+            if now - self.synced_at < SYNC_INTERVAL and self._is_resident(model):
+                return
+
+        self._sync_resident()
+        self._ensure_loaded(model, cold_hit=True)
+
+    def track(self, llm):
+        """
+        A passthrough step that calls touch() for `llm`, e.g. prompt | manager.track(llm) | llm.
+        """
+        self.llms.setdefault(llm.model, []).append(llm)
+
+        def before_call(value):
+            self.touch(llm.model)
+            return value
+
+        return RunnableLambda(before_call)
+
+    def report(self) -> dict:
+        with self.lock:
+            now = time.time()
+            return {
+                "memory_budget": self.memory_budget,
+                "used_bytes": self._used_bytes(),
+                "resident": {model: round(expires_at - now) for model, expires_at in self.resident.items() if expires_at > now},
+                "loading": list(self.loading),
+                "keep_alive": {model: self.keep_alive_for(model) for model in self.model_sizes},
+                "cold_hits": dict(self.cold_hits),
+                "events": list(self.events),
+            }
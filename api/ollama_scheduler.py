@@ -0,0 +1,253 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+from langchain_core.runnables import RunnableGenerator
+
+# Decides which waiting request gets the next slot on the shared Ollama host.
+#
+# Every (route, tenant) pair is a flow with the route's weight. A request's cost is the route's
+# expected output length, learned from finished requests, and it gets a virtual finish tag of
+#   max(virtual clock, flow's last finish tag) + expected length / weight
+# The lowest tag runs next (weighted fair queuing). Since the tag grows with expected length,
+# short chat turns get ahead of long essays without essays starving, because a flow's tags keep
+# growing as it queues more work.
+
+DEFAULT_WEIGHTS = {"chat": 4.0, "poem": 2.0, "essay": 1.0}
+
+# Starting guesses in characters, replaced by a moving average of real output lengths
+DEFAULT_EXPECTED_LENGTHS = {"chat": 600, "poem": 1500, "essay": 3000}
+
+LEARNING_RATE = 0.2
+
+# Set per request by TenantMiddleware from the X-Tenant-ID header. The header is not authenticated,
+# so it must be set by a trusted proxy in front of the app, any client can otherwise claim a fresh tenant.
+current_tenant = contextvars.ContextVar("current_tenant", default="default")
+
+# Flows with queued or running work beyond this share one "overflow" tenant, bounding memory
+MAX_FLOWS = 1000
+OVERFLOW_TENANT = "overflow"
+
+
+class Job:
+    def __init__(self, route: str, tenant: str, start: float, finish: float, seq: int):
+        self.route = route
+        self.tenant = tenant
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.wake = None
+        self.granted = False
+        self.cancelled = False
+        self.output_length = 0
+
+    def __lt__(self, other):
+        return (self.finish, self.seq) < (other.finish, other.seq)
+
+
+class FairScheduler:
+    """
+    Weighted fair queue with a global concurrency cap, usable from async code and from threads.
+    """
+
+    def __init__(self, max_concurrency: int = 2, weights: dict = None, expected_lengths: dict = None):
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.expected_lengths = dict(expected_lengths or DEFAULT_EXPECTED_LENGTHS)
+        self.queue = []
+        self.running = 0
+        self.virtual_time = 0.0
+        self.flow_finish = {}   # (route, tenant) -> finish tag of the flow's last queued request, only while ahead of the clock
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    # --- Queueing (callers hold self.lock) ---
+
+    def _enqueue(self, route: str, wake) -> Job:
+        tenant = current_tenant.get()
+        flow = (route, tenant)
+        if flow not in self.flow_finish and len(self.flow_finish) >= MAX_FLOWS:
+            tenant = OVERFLOW_TENANT
+            flow = (route, tenant)
+        start = max(self.virtual_time, self.flow_finish.get(flow, 0.0))
+        cost = self.expected_lengths.get(route, max(self.expected_lengths.values()))
+        finish = start + cost / self.weights.get(route, 1.0)
+        self.flow_finish[flow] = finish
+
+        job = Job(route, tenant, start, finish, next(self.counter))
+        job.wake = wake
+        heapq.heappush(self.queue, job)
+        self._dispatch()
+        return job
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency and self.queue:
+            job = heapq.heappop(self.queue)
+            if job.cancelled:
+                continue
+            self.running += 1
+            if job.start > self.virtual_time:
+                self.virtual_time = job.start
+                self._prune_flows()
+            job.granted = True
+            job.wake()
+
+    def _prune_flows(self):
+        """
+        Drops flows whose last tag the virtual clock has passed, their next request starts at the clock anyway.
+        """
+        self.flow_finish = {flow: finish for flow, finish in self.flow_finish.items() if finish > self.virtual_time}
+
+    def _release(self, job: Job, completed: bool):
+        with self.lock:
+            self.running -= 1
+            if completed:
+                expected = self.expected_lengths.get(job.route, job.output_length)
+                self.expected_lengths[job.route] = expected + LEARNING_RATE * (job.output_length - expected)
+            self._dispatch()
+            if self.running == 0 and not any(not queued.cancelled for queued in self.queue):
+                # End of a busy period: like start-time fair queuing, the clock catches up with
+                # every tag handed out, which also drops all flows from flow_finish
+                self.virtual_time = max(self.flow_finish.values(), default=self.virtual_time)
+                self._prune_flows()
+
+    def _abandon(self, job: Job):
+        """
+        For a waiter that gave up: frees its slot if it was already granted one,
+        otherwise hands the flow back the share the job had reserved.
+        """
+        with self.lock:
+            job.cancelled = True
+            if not job.granted:
+                self._roll_back(job)
+                return
+        self._release(job, completed=False)
+
+    def _roll_back(self, job: Job):
+        """
+        Undoes a never-started job's tag, so the tenant isn't pushed back for work it never ran.
+        The flow's later queued jobs move up by the job's cost, as if it had never been queued.
+        """
+        flow = (job.route, job.tenant)
+        cost = job.finish - job.start
+        for other in self.queue:
+            if other.seq > job.seq and (other.route, other.tenant) == flow:
+                other.start -= cost
+                other.finish -= cost
+        heapq.heapify(self.queue)
+        if flow in self.flow_finish:
+            self.flow_finish[flow] -= cost
+
+    # --- Slots ---
+
+    @asynccontextmanager
+    async def slot(self, route: str):
+        """
+        async with scheduler.slot("chat") as job: ... waits its turn, then holds one of the host's slots.
+        Add the produced text length to job.output_length so the route's estimate keeps learning.
+        """
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+
+        def set_ready():
+            if not ready.done():
+                ready.set_result(None)
+
+        def wake():
+            loop.call_soon_threadsafe(set_ready)
+
+        with self.lock:
+            job = self._enqueue(route, wake)
+
+        try:
+            await ready
+        except BaseException:
+            self._abandon(job)
+            raise
+
+        try:
+            yield job
+        except BaseException:
+            self._release(job, completed=False)
+            raise
+        self._release(job, completed=True)
+
+    @contextmanager
+    def slot_sync(self, route: str):
+        """
+        Blocking version of slot() for code running in a worker thread.
+        """
+        ready = threading.Event()
+        with self.lock:
+            job = self._enqueue(route, ready.set)
+
+        try:
+            ready.wait()
+        except BaseException:
+            self._abandon(job)
+            raise
+
+        try:
+            yield job
+        except BaseException:
+            self._release(job, completed=False)
+            raise
+        self._release(job, completed=True)
+
+    def wrap(self, runnable, route: str):
+        """
+        Runs `runnable` (usually an Ollama LLM) only while holding a slot, streaming its output through.
+        """
+        def transform(inputs):
+            value = None
+            for chunk in inputs:
+                value = chunk if value is None else value + chunk
+            with self.slot_sync(route) as job:
+                for chunk in runnable.stream(value):
+                    job.output_length += len(chunk)
+                    yield chunk
+
+        async def atransform(inputs):
+            value = None
+            async for chunk in inputs:
+                value = chunk if value is None else value + chunk
+            async with self.slot(route) as job:
+                async for chunk in runnable.astream(value):
+                    job.output_length += len(chunk)
+                    yield chunk
+
+        return RunnableGenerator(transform, atransform, name=f"scheduled_{route}")
+
+    def report(self) -> dict:
+        with self.lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "running": self.running,
+                "queued": sum(1 for job in self.queue if not job.cancelled),
+                "weights": dict(self.weights),
+                "expected_lengths": {route: round(length) for route, length in self.expected_lengths.items()},
+            }
+
+
+class TenantMiddleware:
+    """
+    Reads X-Tenant-ID (HTTP and WebSocket) into current_tenant, so each tenant gets its own flows.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        token = current_tenant.set(headers.get(b"x-tenant-id", b"default").decode("latin-1"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
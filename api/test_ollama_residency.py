@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from fake_ollama import make_server
+from ollama_residency import GB, ResidencyManager
+
+# Runs ResidencyManager against fake_ollama.py. Run from the api folder: python -m pytest
+
+SIZES = {"gemma2:2b": 2 * GB, "llama3.2:1b": 1 * GB, "deepseek-r1:1.5b": 1 * GB, "gemma3": 3 * GB}
+
+
+@pytest.fixture
+def ollama():
+    server, fake = make_server(0, load_seconds=0.2, model_sizes=SIZES)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_address[1]}", fake
+    server.shutdown()
+    server.server_close()
+
+
+def make_manager(base_url, **kwargs):
+    return ResidencyManager(base_url=base_url, model_sizes=SIZES, **kwargs)
+
+
+def test_preload_skips_models_over_budget(ollama):
+    base_url, fake = ollama
+    manager = make_manager(base_url, memory_budget=3 * GB)
+
+    manager.preload(["gemma2:2b", "gemma3", "llama3.2:1b"])
+
+    assert fake.log == [("load", "gemma2:2b"), ("load", "llama3.2:1b")]
+    assert [e["model"] for e in manager.report()["events"] if e["event"] == "skipped_preload"] == ["gemma3"]
+
+
+def test_evicts_least_recently_used_first(ollama):
+    base_url, fake = ollama
+    manager = make_manager(base_url, memory_budget=4 * GB)
+    manager.preload(["gemma2:2b", "llama3.2:1b", "deepseek-r1:1.5b"])
+
+    manager.touch("gemma2:2b")
+    manager.touch("deepseek-r1:1.5b")
+    manager.touch("gemma3")  # needs 3 GB, so llama (oldest) and then gemma2 have to go
+
+    assert fake.log[3:] == [("unload", "llama3.2:1b"), ("unload", "gemma2:2b"), ("load", "gemma3")]
+    assert set(manager.report()["resident"]) == {"deepseek-r1:1.5b", "gemma3"}
+
+
+def test_models_loaded_by_other_clients_count_against_budget(ollama):
+    base_url, fake = ollama
+    fake.generate("gemma3", 300, "")  # e.g. the Streamlit app
+    manager = make_manager(base_url, memory_budget=4 * GB)
+
+    manager.touch("gemma2:2b")
+
+    assert fake.log == [("load", "gemma3"), ("unload", "gemma3"), ("load", "gemma2:2b")]
+
+
+def test_keep_alive_scales_with_traffic(ollama):
+    base_url, _ = ollama
+    manager = make_manager(base_url, min_keep_alive=300, max_keep_alive=3600, busy_requests=4)
+
+    assert manager.keep_alive_for("llama3.2:1b") == 300
+    manager.touch("llama3.2:1b")
+    manager.touch("llama3.2:1b")
+    assert manager.keep_alive_for("llama3.2:1b") == 1950
+    manager.touch("llama3.2:1b")
+    manager.touch("llama3.2:1b")
+    manager.touch("llama3.2:1b")
+    assert manager.keep_alive_for("llama3.2:1b") == 3600
+    assert manager.report()["keep_alive"]["gemma2:2b"] == 300
+
+
+def test_cold_hits_only_count_unloaded_models(ollama):
+    base_url, _ = ollama
+    manager = make_manager(base_url)
+    manager.preload(["llama3.2:1b"])
+
+    manager.touch("llama3.2:1b")
+    manager.touch("deepseek-r1:1.5b")
+    manager.touch("deepseek-r1:1.5b")
+
+    assert manager.report()["cold_hits"] == {"deepseek-r1:1.5b": 1}
+
+
+def test_records_unloads_when_keep_alive_expires(ollama):
+    base_url, _ = ollama
+    manager = make_manager(base_url, min_keep_alive=1)
+    manager.preload(["llama3.2:1b"])
+
+    time.sleep(1.2)
+    manager.touch("deepseek-r1:1.5b")
+
+    unloads = [e for e in manager.report()["events"] if e["event"] == "unload"]
+    assert [(e["model"], e["reason"]) for e in unloads] == [("llama3.2:1b", "expired")]
+
+
+def test_ps_entries_without_a_name_are_skipped(ollama, monkeypatch):
+    base_url, fake = ollama
+    manager = make_manager(base_url)
+    manager.preload(["llama3.2:1b"])
+    ps = fake.ps
+    monkeypatch.setattr(fake, "ps", lambda: {"models": ps()["models"] + [{"size": GB}]})
+
+    manager._sync_resident()
+
+    assert set(manager.report()["resident"]) == {"llama3.2:1b"}
+
+
+def test_loaded_model_does_not_wait_on_another_models_load(ollama):
+    base_url, fake = ollama
+    fake.load_seconds = 1.0
+    manager = make_manager(base_url, memory_budget=16 * GB)
+    manager.preload(["llama3.2:1b"])
+
+    cold = threading.Thread(target=manager.touch, args=("deepseek-r1:1.5b",))
+    cold.start()
+    time.sleep(0.1)
+
+    started = time.perf_counter()
+    manager.touch("llama3.2:1b")
+    assert time.perf_counter() - started < 0.5
+
+    cold.join()
+    assert fake.load_count == 2
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+import ollama_scheduler
+from ollama_scheduler import OVERFLOW_TENANT, FairScheduler, current_tenant
+
+# Run from the api folder: python -m pytest
+
+
+def enqueue(scheduler, route, tenant="default", name=None, granted=None):
+    """
+    Queues a job directly, appending `name` to `granted` when it gets a slot.
+    """
+    current_tenant.set(tenant)
+    with scheduler.lock:
+        return scheduler._enqueue(route, lambda: granted.append(name) if granted is not None else None)
+
+
+def test_max_concurrency_is_enforced():
+    scheduler = FairScheduler(max_concurrency=2)
+    running, peak = 0, 0
+
+    async def request():
+        nonlocal running, peak
+        async with scheduler.slot("chat"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(main())
+
+    assert peak == 2
+    assert scheduler.report()["running"] == 0
+
+
+def test_waiter_cancelled_before_its_slot_is_skipped():
+    scheduler = FairScheduler(max_concurrency=1)
+    order = []
+
+    async def request(name, hold):
+        async with scheduler.slot("chat"):
+            order.append(name)
+            await hold.wait()
+
+    async def main():
+        hold = asyncio.Event()
+        first = asyncio.create_task(request("first", hold))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(request("cancelled", hold))
+        last = asyncio.create_task(request("last", hold))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        hold.set()
+        await asyncio.gather(first, last)
+        return cancelled.cancelled()
+
+    assert asyncio.run(main())
+    assert order == ["first", "last"]
+    report = scheduler.report()
+    assert report["running"] == 0
+    assert report["queued"] == 0
+
+
+def test_waiter_abandoned_after_its_slot_releases_it():
+    scheduler = FairScheduler(max_concurrency=1)
+    granted = []
+    job = enqueue(scheduler, "chat", name="job", granted=granted)
+    enqueue(scheduler, "chat", name="waiting", granted=granted)
+    assert granted == ["job"]
+
+    # The slot was granted but the waiter gave up before using it
+    scheduler._abandon(job)
+
+    assert granted == ["job", "waiting"]
+    assert scheduler.running == 1
+
+
+def test_abandoned_waiter_hands_back_its_flow_share():
+    scheduler = FairScheduler(max_concurrency=1)
+    enqueue(scheduler, "essay", tenant="holder")
+    first = enqueue(scheduler, "chat", tenant="alice")
+    second = enqueue(scheduler, "chat", tenant="alice")
+    second_start = second.start
+
+    scheduler._abandon(first)
+
+    assert second.start == first.start
+    assert second.finish == first.finish
+    assert scheduler.flow_finish[("chat", "alice")] == second.finish
+    assert second.start < second_start
+
+
+def test_expected_lengths_are_learned_from_completed_jobs():
+    scheduler = FairScheduler(max_concurrency=1, expected_lengths={"chat": 600})
+
+    async def main():
+        async with scheduler.slot("chat") as job:
+            job.output_length = 1600
+        with pytest.raises(RuntimeError):
+            async with scheduler.slot("chat") as job:
+                job.output_length = 10
+                raise RuntimeError("failed requests don't count")
+
+    asyncio.run(main())
+
+    assert scheduler.expected_lengths["chat"] == pytest.approx(600 + ollama_scheduler.LEARNING_RATE * 1000)
+
+
+def test_flows_are_pruned_when_the_scheduler_drains():
+    scheduler = FairScheduler(max_concurrency=1)
+
+    async def request(tenant):
+        current_tenant.set(tenant)
+        async with scheduler.slot("chat"):
+            await asyncio.sleep(0)
+
+    async def main():
+        for i in range(50):
+            await request(f"tenant-{i}")
+
+    asyncio.run(main())
+
+    assert scheduler.flow_finish == {}
+
+
+def test_flows_are_pruned_once_the_clock_passes_them():
+    scheduler = FairScheduler(max_concurrency=1)
+    holder = enqueue(scheduler, "essay", tenant="holder")
+    old_chat = enqueue(scheduler, "chat", tenant="old")
+    first, second = [enqueue(scheduler, "essay", tenant="batch") for _ in range(2)]
+    assert ("chat", "old") in scheduler.flow_finish
+
+    scheduler._release(holder, completed=False)    # grants the chat
+    scheduler._release(old_chat, completed=False)  # grants the first batch essay, starting at 0
+    scheduler._release(first, completed=False)     # grants the second, its start moves the clock past the chat
+
+    assert scheduler.virtual_time == second.start
+    assert set(scheduler.flow_finish) == {("essay", "batch")}
+
+
+def test_tenants_past_max_flows_share_the_overflow_flow(monkeypatch):
+    monkeypatch.setattr(ollama_scheduler, "MAX_FLOWS", 2)
+    scheduler = FairScheduler(max_concurrency=0)
+
+    jobs = [enqueue(scheduler, "chat", tenant=name) for name in ("a", "b", "c", "d")]
+
+    assert [job.tenant for job in jobs] == ["a", "b", OVERFLOW_TENANT, OVERFLOW_TENANT]
+    assert set(scheduler.flow_finish) == {("chat", "a"), ("chat", "b"), ("chat", OVERFLOW_TENANT)}
+
+
+def test_chat_goes_ahead_of_an_essay_backlog():
+    scheduler = FairScheduler(max_concurrency=1)
+    granted = []
+    running = enqueue(scheduler, "essay", tenant="batch", name="essay 0", granted=granted)
+    for i in range(1, 6):
+        enqueue(scheduler, "essay", tenant="batch", name=f"essay {i}", granted=granted)
+    enqueue(scheduler, "chat", tenant="alice", name="chat", granted=granted)
+
+    scheduler._release(running, completed=False)
+
+    assert granted == ["essay 0", "chat"]
@@ -0,0 +1,37 @@
+import json
+import os
+import timeit
+from fastapi_img import PromptRequest, ImageResponse, parse_prompt_fast, encode_image_response
+import base64
+
+# Microbenchmarks for the USE_FAST_PATH branch of /api/v1/generate-image.
+# Run from the img_generate folder: python bench_fast_path.py
+
+
+# Roughly the size of a 1024x1024 SDXL PNG
+IMAGE_SIZE = 1_500_000
+NUMBER = 200
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"  {label:<28} {seconds / number * 1e6:10.2f} us")
+
+
+def run():
+    body = json.dumps({"prompt": "a lighthouse on a cliff at sunset, oil painting"}).encode("utf-8")
+    image_bytes = os.urandom(IMAGE_SIZE)
+
+    def encode_with_model():
+        encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+        return ImageResponse(image_base64=encoded_image).model_dump_json().encode("utf-8")
+
+    print("/api/v1/generate-image")
+    bench("parse: pydantic", lambda: PromptRequest.model_validate_json(body), 20000)
+    bench("parse: fast path", lambda: parse_prompt_fast(body), 20000)
+    bench("encode: pydantic", encode_with_model, NUMBER)
+    bench("encode: fast path", lambda: encode_image_response(image_bytes), NUMBER)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,14 +1,23 @@
 import os
+import sys
 import requests
 import base64
-from fastapi import FastAPI, HTTPException
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+# The debug profiler lives in api/ and is shared by both services
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from debug_profiler import add_debug_routes
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Opt-in orjson request parsing and direct base64 response encoding, set USE_FAST_PATH=true to enable
+USE_FAST_PATH = os.getenv("USE_FAST_PATH", "false").lower() == "true"
+
 # --- Pydantic Models for Request and Response ---
 
 class PromptRequest(BaseModel):
@@ -45,13 +54,11 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
-# --- API Endpoint ---
+# --- Hugging Face Call ---
 
-@app.post("/api/v1/generate-image", response_model=ImageResponse, tags=["Image Generation"])
-async def generate_image(request: PromptRequest):
+def fetch_image(prompt: str) -> bytes:
     """
-    Takes a text prompt and returns a Base64 encoded image.
-    This corresponds to the "image-generator" tool ID.
+    Calls the Hugging Face Inference API and returns the raw image bytes.
     """
     api_key = os.getenv("HUGGINGFACE_API_KEY")
     if not api_key:
@@ -59,15 +66,13 @@ async def generate_image(request: PromptRequest):
 
     api_url = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
     headers = {"Authorization": f"Bearer {api_key}"}
-    payload = {"inputs": request.prompt}
+    payload = {"inputs": prompt}
 
     try:
         response = requests.post(api_url, headers=headers, json=payload)
         response.raise_for_status()  # Raise an exception for non-200 status codes
 
-        encoded_image = base64.b64encode(response.content).decode("utf-8")
-        
-        return ImageResponse(image_base64=encoded_image)
+        return response.content
 
     except requests.exceptions.HTTPError as e:
         # Handle specific API errors from Hugging Face
@@ -79,6 +84,74 @@ async def generate_image(request: PromptRequest):
         # Handle other unexpected errors
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
+# --- Fast Path Helpers ---
+
+def parse_prompt_fast(body: bytes) -> str:
+    """
+    Reads the prompt out of the raw request body without building a PromptRequest.
+    """
+    try:
+        prompt = orjson.loads(body)["prompt"]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        raise HTTPException(status_code=422, detail='Expected a body like {"prompt": "..."}.')
+
+    if not isinstance(prompt, str):
+        raise HTTPException(status_code=422, detail="'prompt' must be a string.")
+
+    return prompt
+
+def encode_image_response(image_bytes: bytes) -> bytes:
+    """
+    Builds the ImageResponse JSON body directly from the image bytes.
+    The base64 alphabet never needs JSON escaping, so the encoded bytes are
+    joined into the body as-is instead of being decoded to a str and re-encoded.
+    """
+    return b"".join((b'{"image_base64":"', base64.b64encode(image_bytes), b'"}'))
+
+# --- API Endpoint ---
+
+async def generate_image(request: PromptRequest):
+    """
+    Takes a text prompt and returns a Base64 encoded image.
+    This corresponds to the "image-generator" tool ID.
+    """
+    image_bytes = fetch_image(request.prompt)
+    encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+
+    return ImageResponse(image_base64=encoded_image)
+
+async def generate_image_fast(request: Request):
+    """
+    Same contract as generate_image, using the fast path helpers above.
+    """
+    prompt = parse_prompt_fast(await request.body())
+    image_bytes = fetch_image(prompt)
+
+    return Response(content=encode_image_response(image_bytes), media_type="application/json")
+
+# generate_image_fast reads the raw body and returns a Response, so FastAPI can't infer either
+# schema from it. The PromptRequest body is declared by hand and response_model stays for the docs.
+fast_path_docs = {
+    "openapi_extra": {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": PromptRequest.model_json_schema()}},
+        }
+    }
+}
+
+app.add_api_route(
+    "/api/v1/generate-image",
+    generate_image_fast if USE_FAST_PATH else generate_image,
+    methods=["POST"],
+    response_model=ImageResponse,
+    tags=["Image Generation"],
+    **(fast_path_docs if USE_FAST_PATH else {}),
+)
+
+# /debug/profile and /debug/loop, only when DEBUG_PROFILE_TOKEN is set
+add_debug_routes(app)
+
 # Health check endpoint
 @app.get("/", tags=["Health Check"])
 def read_root():